@@ -1,9 +1,16 @@
+import os
+import threading
+import time
+import bcrypt
 from flask_login import LoginManager, UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from db import db_read, db_write
 
 login_manager = LoginManager()
 
+# bcrypt cost factor; lower it (e.g. 4) for local testing, raise it as hardware gets faster
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 class User(UserMixin):
     def __init__(self, row):
         self.id = row["id"]
@@ -13,16 +20,26 @@ class User(UserMixin):
         self.license_number = row["license_number"]
         self.club_id = row["club_id"]
         self.role = row["role"]
-        self.password_hash = row["password_hash"]
+        # Only loaded by by_email() for authentication
+        self.password_hash = row.get("password_hash")
+        self.club_name = row.get("club_name")
 
     @staticmethod
     def by_id(user_id: int):
-        row = db_read("SELECT * FROM users WHERE id=%s", (user_id,), single=True)
+        row = db_read("""
+            SELECT u.id, u.first_name, u.last_name, u.email, u.license_number,
+                   u.club_id, u.role, c.name AS club_name
+            FROM users u LEFT JOIN clubs c ON c.id=u.club_id
+            WHERE u.id=%s
+        """, (user_id,), single=True)
         return User(row) if row else None
 
     @staticmethod
     def by_email(email: str):
-        row = db_read("SELECT * FROM users WHERE email=%s", (email,), single=True)
+        row = db_read("""
+            SELECT id, first_name, last_name, email, license_number, club_id, role, password_hash
+            FROM users WHERE email=%s
+        """, (email,), single=True)
         return User(row) if row else None
 
 @login_manager.user_loader
@@ -32,15 +49,55 @@ def load_user(user_id):
     except Exception:
         return None
 
+# Reload license_club_map at least this often, so prefixes edited in the database take effect
+LICENSE_MAP_TTL_SECONDS = 300
+
+_prefix_trie = None
+_prefix_trie_expires = 0.0
+_prefix_trie_lock = threading.Lock()
+
+def _load_prefix_trie():
+    # Build a dict-of-dicts trie of license prefixes; the "" key on a node holds its club_id
+    trie = {}
+    for m in db_read("SELECT license_prefix, club_id FROM license_club_map"):
+        node = trie
+        for ch in m["license_prefix"]:
+            node = node.setdefault(ch, {})
+        node[""] = m["club_id"]
+    return trie
+
+def _longest_prefix_club(trie, license_number: str):
+    best = trie.get("")
+    node = trie
+    for ch in license_number:
+        node = node.get(ch)
+        if node is None:
+            break
+        best = node.get("", best)
+    return best
+
 def _club_from_license(license_number: str):
     # Match by prefix mapping: find the longest prefix that matches start of license number
-    mappings = db_read("SELECT license_prefix, club_id FROM license_club_map")
-    best = None
-    for m in mappings:
-        pref = m["license_prefix"]
-        if license_number.startswith(pref) and (best is None or len(pref) > len(best["license_prefix"])):
-            best = m
-    return best["club_id"] if best else None
+    global _prefix_trie, _prefix_trie_expires
+    trie = _prefix_trie
+    fresh = trie is not None and time.monotonic() < _prefix_trie_expires
+    club_id = _longest_prefix_club(trie, license_number) if fresh else None
+    if club_id is None:
+        # Not loaded, expired, or license_club_map got a new prefix since: reload once and retry
+        with _prefix_trie_lock:
+            _prefix_trie = trie = _load_prefix_trie()
+            _prefix_trie_expires = time.monotonic() + LICENSE_MAP_TTL_SECONDS
+        club_id = _longest_prefix_club(trie, license_number)
+    return club_id
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("ascii")
+
+def verify_password(pw_hash: str, password: str) -> bool:
+    if pw_hash.startswith("$2"):
+        return bcrypt.checkpw(password.encode("utf-8"), pw_hash.encode("ascii"))
+    # Older accounts still carry werkzeug scrypt/pbkdf2 hashes
+    return check_password_hash(pw_hash, password)
 
 def register_user(first_name, last_name, email, license_number, password):
     email = email.strip().lower()
@@ -50,11 +107,14 @@ def register_user(first_name, last_name, email, license_number, password):
     if exists:
         return False, "Email oder Lizenznummer existiert bereits."
 
+    if len(password.encode("utf-8")) > 72:
+        return False, "Passwort ist zu lang (maximal 72 Bytes)."
+
     club_id = _club_from_license(license_number)
     if not club_id:
         return False, "Lizenznummer nicht bekannt: keine Club-Zuordnung (license_club_map)."
 
-    pw_hash = generate_password_hash(password)
+    pw_hash = hash_password(password)
 
     db_write("""
         INSERT INTO users (first_name,last_name,email,license_number,password_hash,club_id,role)
@@ -67,6 +127,10 @@ def authenticate(email, password):
     u = User.by_email(email.strip().lower())
     if not u:
         return None
-    if check_password_hash(u.password_hash, password):
-        return u
-    return None
+    if not verify_password(u.password_hash, password):
+        return None
+    if not u.password_hash.startswith("$2"):
+        # Upgrade legacy werkzeug hashes to bcrypt on successful login
+        u.password_hash = hash_password(password)
+        db_write("UPDATE users SET password_hash=%s WHERE id=%s", (u.password_hash, u.id))
+    return u
@@ -1,4 +1,6 @@
 import os
+import sys
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from mysql.connector import pooling
 
@@ -9,29 +11,91 @@ DB_CONFIG = {
     "user": os.getenv("DB_USER"),
     "password": os.getenv("DB_PASSWORD"),
     "database": os.getenv("DB_DATABASE"),
+    # Single statements commit on their own; db_transaction() opens explicit transactions.
+    # Without this, a plain SELECT would leave a stale snapshot open on the pooled connection.
+    "autocommit": True,
 }
 
-_pool = pooling.MySQLConnectionPool(pool_name="interclub_pool", pool_size=2, **DB_CONFIG)
+# The pool opens all connections at startup and a request uses one, so a few per worker suffice.
+# Keep DB_POOL_SIZE * web workers below the MySQL max_connections / max_user_connections limit
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "3"))
 
-def _conn():
-    return _pool.get_connection()
+_pool = pooling.MySQLConnectionPool(
+    pool_name="interclub_pool",
+    pool_size=DB_POOL_SIZE,
+    pool_reset_session=False,
+    **DB_CONFIG
+)
 
-def db_read(sql, params=None, single=False):
-    conn = _conn()
-    cur = conn.cursor(dictionary=True)
-    try:
-        cur.execute(sql, params or ())
-        return cur.fetchone() if single else cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+def _request_g():
+    # db.py does not import Flask itself, so scripts and workers can use it without the web stack
+    flask = sys.modules.get("flask")
+    if flask is not None and flask.has_app_context():
+        return flask.g
+    return None
 
-def db_write(sql, params=None):
-    conn = _conn()
-    cur = conn.cursor()
+@contextmanager
+def _conn():
+    g = _request_g()
+    if g is not None:
+        # One pooled connection per request, released in close_db()
+        if "db" not in g:
+            g.db = _pool.get_connection()
+        yield g.db
+        return
+    # Outside of Flask (scripts, shell): check out a connection just for this call
+    conn = _pool.get_connection()
     try:
-        cur.execute(sql, params or ())
-        conn.commit()
+        yield conn
     finally:
-        cur.close()
         conn.close()
+
+def close_db(exc=None):
+    from flask import g
+    conn = g.pop("db", None)
+    if conn is not None:
+        try:
+            # Never hand a half-finished transaction to the next request
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            conn.close()
+
+def init_db(app):
+    app.teardown_appcontext(close_db)
+
+# Queries use the plain text protocol on purpose. mysql-connector's prepared cursors
+# (cursor(prepared=True)) send COM_STMT_RESET before every execute, so each call costs two
+# round-trips instead of one, which outweighs the saved parsing for these small queries.
+def db_read(sql, params=None, single=False):
+    with _conn() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, params or ())
+            return cur.fetchone() if single else cur.fetchall()
+        finally:
+            cur.close()
+
+def db_write(sql, params=None, rowcount=False):
+    with _conn() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params or ())
+            return cur.rowcount if rowcount else cur.lastrowid
+        finally:
+            cur.close()
+
+@contextmanager
+def db_transaction():
+    """Run several statements on one connection and commit them together."""
+    with _conn() as conn:
+        conn.start_transaction()
+        cur = conn.cursor(dictionary=True)
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
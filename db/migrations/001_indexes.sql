@@ -0,0 +1,17 @@
+-- Composite indexes for the hot JOIN / WHERE / ORDER BY patterns.
+-- Only needed for databases created before these keys were added to schema.sql.
+--
+-- Already covered by existing keys:
+--   team_membership (user_id, team_id)  -> PRIMARY KEY
+--   availability (match_date_id, user_id) -> uniq_avail
+--   lineup (match_id, user_id)          -> PRIMARY KEY
+--   users (email), users (license_number) -> UNIQUE
+
+-- Approved / pending members of a team
+CREATE INDEX ix_tm_team_appr ON team_membership (team_id, is_approved);
+
+-- Proposed dates of a match, in display order
+CREATE INDEX ix_md_match ON match_dates (match_id, proposed_datetime);
+
+-- Latest messages of a match
+CREATE INDEX ix_mm_match_created ON match_messages (match_id, created_at);
@@ -0,0 +1,37 @@
+-- Deleting a team or match removes everything that belongs to it (ON DELETE CASCADE).
+-- Required by team_delete / match_delete, which only delete the parent row.
+--
+-- The dropped names are the ones InnoDB generated for the original schema.sql
+-- (<table>_ibfk_<n>, numbered in declaration order). Check with SHOW CREATE TABLE
+-- if your database was created differently.
+--
+-- Each key is dropped and re-added in separate statements: MySQL does not support
+-- dropping and adding a foreign key in the same ALTER TABLE when it copies the table.
+
+ALTER TABLE team_membership DROP FOREIGN KEY team_membership_ibfk_2;
+ALTER TABLE team_membership
+  ADD CONSTRAINT fk_tm_team FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE;
+
+ALTER TABLE matches DROP FOREIGN KEY matches_ibfk_1;
+ALTER TABLE matches
+  ADD CONSTRAINT fk_matches_team FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE;
+
+ALTER TABLE match_dates DROP FOREIGN KEY match_dates_ibfk_1;
+ALTER TABLE match_dates
+  ADD CONSTRAINT fk_md_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE;
+
+ALTER TABLE availability DROP FOREIGN KEY availability_ibfk_1;
+ALTER TABLE availability
+  ADD CONSTRAINT fk_av_date FOREIGN KEY (match_date_id) REFERENCES match_dates(id) ON DELETE CASCADE;
+
+ALTER TABLE lineup DROP FOREIGN KEY lineup_ibfk_1;
+ALTER TABLE lineup
+  ADD CONSTRAINT fk_lineup_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE;
+
+ALTER TABLE match_tasks DROP FOREIGN KEY match_tasks_ibfk_1;
+ALTER TABLE match_tasks
+  ADD CONSTRAINT fk_mt_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE;
+
+ALTER TABLE match_messages DROP FOREIGN KEY match_messages_ibfk_1;
+ALTER TABLE match_messages
+  ADD CONSTRAINT fk_mm_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE;
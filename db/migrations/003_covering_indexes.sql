@@ -0,0 +1,15 @@
+-- Covering indexes for the dashboard, teams list and availability summaries.
+-- match_messages (match_id, created_at) already exists as ix_mm_match_created
+-- (001_indexes.sql); InnoDB reads it backwards for ORDER BY created_at DESC.
+
+-- Dashboard: approved teams of a user
+CREATE INDEX ix_tm_user_approved ON team_membership (user_id, is_approved, team_id);
+
+-- Dashboard / team pages: matches of a team ordered by date
+CREATE INDEX ix_matches_team_final ON matches (team_id, final_date, created_at);
+
+-- Teams list: teams of a club ordered by name
+CREATE INDEX ix_teams_club_name ON teams (club_id, name);
+
+-- Captain summary: available players per proposed date
+CREATE INDEX ix_availability_date_user ON availability (match_date_id, user_id, available);
@@ -31,6 +31,7 @@ CREATE TABLE IF NOT EXISTS teams (
   name VARCHAR(120) NOT NULL,
   captain_id INT NOT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  KEY ix_teams_club_name (club_id, name),
   FOREIGN KEY (club_id) REFERENCES clubs(id),
   FOREIGN KEY (captain_id) REFERENCES users(id)
 );
@@ -42,8 +43,10 @@ CREATE TABLE IF NOT EXISTS team_membership (
   requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   approved_at TIMESTAMP NULL,
   PRIMARY KEY (user_id, team_id),
+  KEY ix_tm_team_appr (team_id, is_approved),
+  KEY ix_tm_user_approved (user_id, is_approved, team_id),
   FOREIGN KEY (user_id) REFERENCES users(id),
-  FOREIGN KEY (team_id) REFERENCES teams(id)
+  CONSTRAINT fk_tm_team FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
 );
 
 CREATE TABLE IF NOT EXISTS matches (
@@ -54,14 +57,16 @@ CREATE TABLE IF NOT EXISTS matches (
   final_date DATETIME NULL,
   status VARCHAR(20) NOT NULL DEFAULT 'planned', -- planned|confirmed|completed
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY (team_id) REFERENCES teams(id)
+  KEY ix_matches_team_final (team_id, final_date, created_at),
+  CONSTRAINT fk_matches_team FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
 );
 
 CREATE TABLE IF NOT EXISTS match_dates (
   id INT AUTO_INCREMENT PRIMARY KEY,
   match_id INT NOT NULL,
   proposed_datetime DATETIME NOT NULL,
-  FOREIGN KEY (match_id) REFERENCES matches(id)
+  KEY ix_md_match (match_id, proposed_datetime),
+  CONSTRAINT fk_md_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE
 );
 
 CREATE TABLE IF NOT EXISTS availability (
@@ -71,7 +76,8 @@ CREATE TABLE IF NOT EXISTS availability (
   available BOOLEAN NOT NULL DEFAULT TRUE,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   UNIQUE KEY uniq_avail (match_date_id, user_id),
-  FOREIGN KEY (match_date_id) REFERENCES match_dates(id),
+  KEY ix_availability_date_user (match_date_id, user_id, available),
+  CONSTRAINT fk_av_date FOREIGN KEY (match_date_id) REFERENCES match_dates(id) ON DELETE CASCADE,
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -81,7 +87,7 @@ CREATE TABLE IF NOT EXISTS lineup (
   confirmed BOOLEAN NOT NULL DEFAULT FALSE,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (match_id, user_id),
-  FOREIGN KEY (match_id) REFERENCES matches(id),
+  CONSTRAINT fk_lineup_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE,
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -91,7 +97,7 @@ CREATE TABLE IF NOT EXISTS match_tasks (
   user_id INT NOT NULL,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (match_id, task),
-  FOREIGN KEY (match_id) REFERENCES matches(id),
+  CONSTRAINT fk_mt_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE,
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -101,7 +107,8 @@ CREATE TABLE IF NOT EXISTS match_messages (
   user_id INT NOT NULL,
   content TEXT NOT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY (match_id) REFERENCES matches(id),
+  KEY ix_mm_match_created (match_id, created_at),
+  CONSTRAINT fk_mm_match FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE,
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -1,11 +1,11 @@
 import os
 from dotenv import load_dotenv
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, session, after_this_request, has_request_context
 from flask_login import login_user, logout_user, login_required, current_user
-from flask_mail import Mail, Message
+from jinja2 import FileSystemBytecodeCache
 
-from db import db_read, db_write
+from db import db_read, db_write, db_transaction, init_db
 from auth import login_manager, authenticate, register_user
 
 load_dotenv()
@@ -13,6 +13,10 @@ load_dotenv()
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "change-me")
 
+# Compiled templates survive worker restarts; entries are keyed by source checksum, so edits still apply.
+# (Template auto-reload is already off unless the app runs in debug mode.)
+app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache()}
+
 # Optional email config (works if you set env vars)
 app.config["MAIL_SERVER"] = os.getenv("MAIL_SERVER")
 app.config["MAIL_PORT"] = int(os.getenv("MAIL_PORT", "587"))
@@ -21,87 +25,120 @@ app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")
 app.config["MAIL_PASSWORD"] = os.getenv("MAIL_PASSWORD")
 app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_DEFAULT_SENDER", app.config["MAIL_USERNAME"])
 
-mail = Mail(app)
-
+init_db(app)
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+_mail = None
 
-def send_email(to_email: str, subject: str, body: str) -> None:
-    """Send email if SMTP env vars are configured. Otherwise do nothing."""
-    if not app.config.get("MAIL_SERVER") or not app.config.get("MAIL_USERNAME"):
+
+def get_mail():
+    """Create the Flask-Mail extension on first use; most requests never send mail."""
+    global _mail
+    if _mail is None:
+        from flask_mail import Mail
+        _mail = Mail(app)
+    return _mail
+
+
+def _mail_configured() -> bool:
+    return bool(app.config.get("MAIL_SERVER") and app.config.get("MAIL_USERNAME"))
+
+
+def _deliver(items: list) -> None:
+    """Send after the response went out (WSGI close hook), so SMTP never delays the page."""
+    def send():
+        with app.app_context():
+            try:
+                from flask_mail import Message
+                # One SMTP session (connect, STARTTLS, login) for all messages
+                with get_mail().connect() as conn:
+                    for to_email, subject, body in items:
+                        try:
+                            conn.send(Message(subject=subject, recipients=[to_email], body=body))
+                        except Exception:
+                            pass
+            except Exception:
+                pass
+
+    if not has_request_context():
+        send()
         return
-    try:
-        msg = Message(subject=subject, recipients=[to_email], body=body)
-        mail.send(msg)
-    except Exception:
-        pass
 
+    @after_this_request
+    def _send_on_close(response):
+        response.call_on_close(send)
+        return response
 
-def safe_get_team_id(club_id: int, captain_id: int, name: str) -> int:
-    """Fetch latest team id for (club_id, captain_id, name). Safe across connections."""
-    row = db_read(
-        "SELECT id FROM teams WHERE club_id=%s AND captain_id=%s AND name=%s "
-        "ORDER BY id DESC LIMIT 1",
-        (club_id, captain_id, name),
-        single=True
-    )
-    if not row:
-        raise RuntimeError("Team insert succeeded but could not fetch team id.")
-    return int(row["id"])
 
+def send_email(to_email: str, subject: str, body: str) -> None:
+    """Send email if SMTP env vars are configured. Otherwise do nothing."""
+    send_emails([(to_email, subject, body)])
 
-def safe_get_match_id(team_id: int, opponent: str, location: str) -> int:
-    """Fetch latest match id for (team_id, opponent, location). Safe across connections."""
-    row = db_read(
-        "SELECT id FROM matches WHERE team_id=%s AND opponent=%s AND location=%s "
-        "ORDER BY id DESC LIMIT 1",
-        (team_id, opponent, location),
-        single=True
-    )
-    if not row:
-        raise RuntimeError("Match insert succeeded but could not fetch match id.")
-    return int(row["id"])
+
+def send_emails(items: list) -> None:
+    """Send several (to_email, subject, body) emails over a single SMTP connection."""
+    if not items or not _mail_configured():
+        return
+    _deliver(list(items))
 
 
 # ------------------------
 # Landing / Auth
 # ------------------------
 
+_anonymous_pages = {}
+
+
+def anonymous_page(template: str) -> str:
+    """Render a page without per-user content once per process and reuse the HTML.
+
+    Only logged-out visitors without pending flash messages get the cached copy.
+    """
+    if current_user.is_authenticated or "_flashes" in session:
+        return render_template(template)
+    html = _anonymous_pages.get(template)
+    if html is None:
+        html = _anonymous_pages[template] = render_template(template)
+    return html
+
+
 @app.get("/")
 def landing():
     if current_user.is_authenticated:
         return redirect(url_for("dashboard"))
-    return render_template("landing.html")
+    return anonymous_page("landing.html")
 
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
-        user = authenticate(request.form["email"], request.form["password"])
+        f = request.form
+        user = authenticate(f["email"], f["password"])
         if user:
             login_user(user)
             flash("Willkommen zurück!", "success")
             return redirect(url_for("dashboard"))
         flash("Login fehlgeschlagen.", "danger")
-    return render_template("login.html")
+    return anonymous_page("login.html")
 
 
 @app.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
+        f = request.form
         ok, msg = register_user(
-            request.form["first_name"],
-            request.form["last_name"],
-            request.form["email"],
-            request.form["license_number"],
-            request.form["password"]
+            f["first_name"],
+            f["last_name"],
+            f["email"],
+            f["license_number"],
+            f["password"]
         )
         if ok:
             flash("Registrierung erfolgreich. Bitte einloggen.", "success")
             return redirect(url_for("login"))
         flash(msg, "danger")
-    return render_template("register.html")
+    return anonymous_page("register.html")
 
 
 @app.get("/logout")
@@ -118,9 +155,6 @@ def logout():
 @app.get("/dashboard")
 @login_required
 def dashboard():
-    club = db_read("SELECT name FROM clubs WHERE id=%s", (current_user.club_id,), single=True)
-    club_name = club["name"] if club else None
-
     my_teams = db_read("""
         SELECT t.id, t.name, tm.is_approved,
                (t.captain_id=%s) AS is_captain
@@ -143,7 +177,7 @@ def dashboard():
     is_captain_or_admin = current_user.role in ("captain", "club_admin")
     return render_template(
         "dashboard.html",
-        club_name=club_name,
+        club_name=current_user.club_name,
         my_teams=my_teams,
         upcoming_matches=upcoming_matches,
         is_captain_or_admin=is_captain_or_admin
@@ -157,41 +191,30 @@ def dashboard():
 @app.get("/teams")
 @login_required
 def teams():
-    club = db_read("SELECT name FROM clubs WHERE id=%s", (current_user.club_id,), single=True)
-    club_name = club["name"] if club else None
-
     rows = db_read("""
         SELECT t.id, t.name,
                CONCAT(u.first_name,' ',u.last_name) AS captain_name,
-               (t.captain_id=%s) AS is_captain
+               (t.captain_id=%s) AS is_captain,
+               (tm.is_approved=1) AS is_my_team,
+               (tm.is_approved=0) AS is_pending
         FROM teams t
         JOIN users u ON u.id=t.captain_id
+        LEFT JOIN team_membership tm ON tm.team_id=t.id AND tm.user_id=%s
         WHERE t.club_id=%s
         ORDER BY t.name
-    """, (current_user.id, current_user.club_id))
-
-    mem = db_read("SELECT team_id, is_approved FROM team_membership WHERE user_id=%s", (current_user.id,))
-    mem_map = {m["team_id"]: m for m in mem}
-
-    teams_list = []
-    for r in rows:
-        tid = r["id"]
-        teams_list.append({
-            "id": tid,
-            "name": r["name"],
-            "captain_name": r["captain_name"],
-            "is_captain": bool(r["is_captain"]),
-            "is_my_team": tid in mem_map and mem_map[tid]["is_approved"] == 1,
-            "is_pending": tid in mem_map and mem_map[tid]["is_approved"] == 0,
-        })
+    """, (current_user.id, current_user.id, current_user.club_id))
 
     is_captain_or_admin = current_user.role in ("captain", "club_admin")
-    return render_template("teams.html", teams=teams_list, club_name=club_name, is_captain_or_admin=is_captain_or_admin)
+    return render_template("teams.html", teams=rows, club_name=current_user.club_name, is_captain_or_admin=is_captain_or_admin)
 @app.get("/team/<int:team_id>")
 @login_required
 def team_view(team_id):
     # team must belong to user's club
-    team = db_read("SELECT * FROM teams WHERE id=%s AND club_id=%s", (team_id, current_user.club_id), single=True)
+    team = db_read(
+        "SELECT id, name, captain_id FROM teams WHERE id=%s AND club_id=%s",
+        (team_id, current_user.club_id),
+        single=True
+    )
     if not team:
         return "Not found", 404
 
@@ -199,7 +222,7 @@ def team_view(team_id):
     is_captain = (team["captain_id"] == current_user.id) or (current_user.role == "club_admin")
     if not is_captain:
         mem = db_read("""
-            SELECT * FROM team_membership
+            SELECT 1 FROM team_membership
             WHERE team_id=%s AND user_id=%s AND is_approved=1
         """, (team_id, current_user.id), single=True)
         if not mem:
@@ -225,28 +248,7 @@ def team_create_route():
         flash("Nur Captains können Teams erstellen. Bitte wende dich an deinen Club Admin.", "danger")
         return redirect(url_for("teams"))
 
-    return """
-    <!doctype html><html><head><meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <title>Team erstellen</title>
-    </head><body class="p-4">
-    <div class="container" style="max-width:720px;">
-      <h3 class="mb-3">Team erstellen</h3>
-      <div class="text-muted mb-3">
-        Nur Benutzer mit Rolle <strong>captain</strong> oder <strong>club_admin</strong> können Teams erstellen.
-      </div>
-      <form method="post" action="/team/create" class="row g-2">
-        <div class="col-md-8">
-          <input class="form-control" name="name" placeholder="Teamname" required>
-        </div>
-        <div class="col-md-4">
-          <button class="btn btn-primary w-100">Erstellen</button>
-        </div>
-      </form>
-      <div class="mt-3"><a href="/teams">← zurück</a></div>
-    </div></body></html>
-    """
+    return render_template("team_create.html")
 
 
 @app.post("/team/create")
@@ -261,18 +263,18 @@ def team_create_route_post():
         flash("Teamname fehlt.", "danger")
         return redirect(url_for("teams"))
 
-    db_write(
-        "INSERT INTO teams (club_id, name, captain_id) VALUES (%s, %s, %s)",
-        (current_user.club_id, name, current_user.id)
-    )
-
-    team_id = safe_get_team_id(current_user.club_id, current_user.id, name)
+    with db_transaction() as cur:
+        cur.execute(
+            "INSERT INTO teams (club_id, name, captain_id) VALUES (%s, %s, %s)",
+            (current_user.club_id, name, current_user.id)
+        )
+        team_id = cur.lastrowid
 
-    db_write(
-        "INSERT INTO team_membership (user_id, team_id, is_approved, approved_at) "
-        "VALUES (%s, %s, 1, NOW())",
-        (current_user.id, team_id)
-    )
+        cur.execute(
+            "INSERT INTO team_membership (user_id, team_id, is_approved, approved_at) "
+            "VALUES (%s, %s, 1, NOW())",
+            (current_user.id, team_id)
+        )
 
     flash("Team erstellt.", "success")
     return redirect(url_for("team_manage", team_id=team_id))
@@ -283,7 +285,7 @@ def team_create_route_post():
 # ------------------------
 
 def require_captain(team_id: int):
-    team = db_read("SELECT * FROM teams WHERE id=%s", (team_id,), single=True)
+    team = db_read("SELECT id, club_id, name, captain_id FROM teams WHERE id=%s", (team_id,), single=True)
     if not team:
         return None
     if team["captain_id"] != current_user.id and current_user.role != "club_admin":
@@ -298,23 +300,8 @@ def team_delete(team_id):
     if not team:
         return "Unauthorized", 403
 
-    # Delete everything belonging to this team (manual cascade)
-    match_ids = db_read("SELECT id FROM matches WHERE team_id=%s", (team_id,))
-    for r in match_ids:
-        mid = int(r["id"])
-        # messages, tasks, lineup, availability, match_dates, matches
-        db_write("DELETE FROM match_messages WHERE match_id=%s", (mid,))
-        db_write("DELETE FROM match_tasks WHERE match_id=%s", (mid,))
-        db_write("DELETE FROM lineup WHERE match_id=%s", (mid,))
-        db_write("""
-            DELETE a FROM availability a
-            JOIN match_dates md ON md.id=a.match_date_id
-            WHERE md.match_id=%s
-        """, (mid,))
-        db_write("DELETE FROM match_dates WHERE match_id=%s", (mid,))
-        db_write("DELETE FROM matches WHERE id=%s", (mid,))
-
-    db_write("DELETE FROM team_membership WHERE team_id=%s", (team_id,))
+    # Matches (with dates, availability, lineup, tasks, messages) and memberships
+    # are removed by ON DELETE CASCADE
     db_write("DELETE FROM teams WHERE id=%s", (team_id,))
 
     flash("Team gelöscht.", "success")
@@ -329,33 +316,32 @@ def team_delete(team_id):
 @login_required
 def team_join():
     team_id = int(request.form["team_id"])
-    exists = db_read(
-        "SELECT * FROM team_membership WHERE user_id=%s AND team_id=%s",
-        (current_user.id, team_id),
-        single=True
-    )
-    if exists:
-        flash("Du hast bereits eine Anfrage / Mitgliedschaft.", "warning")
-        return redirect(url_for("teams"))
-
-    db_write(
-        "INSERT INTO team_membership (user_id, team_id, is_approved) VALUES (%s, %s, 0)",
-        (current_user.id, team_id)
-    )
 
+    # The team must exist in the user's club; INSERT IGNORE would hide a foreign key error
     captain = db_read("""
         SELECT u.email, u.first_name
         FROM teams t
         JOIN users u ON u.id=t.captain_id
-        WHERE t.id=%s
-    """, (team_id,), single=True)
+        WHERE t.id=%s AND t.club_id=%s
+    """, (team_id, current_user.club_id), single=True)
+    if not captain:
+        return "Not found", 404
 
-    if captain:
-        send_email(
-            captain["email"],
-            "Neue Team-Anfrage",
-            f"Hallo {captain['first_name']},\n\nEs gibt eine neue Beitrittsanfrage in deinem Team.\n\n— Interclub Organizer"
-        )
+    # PRIMARY KEY (user_id, team_id) makes this a no-op if a request / membership exists
+    created = db_write(
+        "INSERT IGNORE INTO team_membership (user_id, team_id, is_approved) VALUES (%s, %s, 0)",
+        (current_user.id, team_id),
+        rowcount=True
+    )
+    if not created:
+        flash("Du hast bereits eine Anfrage / Mitgliedschaft.", "warning")
+        return redirect(url_for("teams"))
+
+    send_email(
+        captain["email"],
+        "Neue Team-Anfrage",
+        f"Hallo {captain['first_name']},\n\nEs gibt eine neue Beitrittsanfrage in deinem Team.\n\n— Interclub Organizer"
+    )
 
     flash("Beitrittsanfrage gesendet.", "success")
     return redirect(url_for("teams"))
@@ -368,25 +354,25 @@ def team_join():
 @app.get("/team/<int:team_id>/manage")
 @login_required
 def team_manage(team_id):
-    team = require_captain(team_id)
-    if not team:
-        return "Unauthorized", 403
-
-    members = db_read("""
-        SELECT u.id,u.first_name,u.last_name,u.email
-        FROM team_membership tm
-        JOIN users u ON u.id=tm.user_id
-        WHERE tm.team_id=%s AND tm.is_approved=1
+    # Team, captain check and all memberships in one query (one row per membership)
+    people = db_read("""
+        SELECT t.id AS team_id, t.name AS team_name, t.captain_id,
+               u.id, u.first_name, u.last_name, u.email, tm.is_approved
+        FROM teams t
+        LEFT JOIN team_membership tm ON tm.team_id=t.id
+        LEFT JOIN users u ON u.id=tm.user_id
+        WHERE t.id=%s
         ORDER BY u.last_name
     """, (team_id,))
+    if not people:
+        return "Unauthorized", 403
+    first = people[0]
+    if first["captain_id"] != current_user.id and current_user.role != "club_admin":
+        return "Unauthorized", 403
 
-    requests_rows = db_read("""
-        SELECT u.id,u.first_name,u.last_name,u.email
-        FROM team_membership tm
-        JOIN users u ON u.id=tm.user_id
-        WHERE tm.team_id=%s AND tm.is_approved=0
-        ORDER BY u.last_name
-    """, (team_id,))
+    team = {"id": first["team_id"], "name": first["team_name"], "captain_id": first["captain_id"]}
+    members = [p for p in people if p["is_approved"] == 1]
+    requests_rows = [p for p in people if p["is_approved"] == 0]
 
     matches = db_read("""
         SELECT id, opponent, status, final_date, location
@@ -401,20 +387,23 @@ def team_manage(team_id):
 @app.post("/team/requests")
 @login_required
 def team_requests():
-    team_id = int(request.form["team_id"])
-    user_id = int(request.form["user_id"])
-    action = request.form["action"]
-
-    team = require_captain(team_id)
-    if not team:
-        return "Unauthorized", 403
+    f = request.form
+    team_id = int(f["team_id"])
+    user_id = int(f["user_id"])
+    action = f["action"]
 
+    # The captain check is part of the UPDATE / DELETE: nothing changes for anyone else
+    is_admin = current_user.role == "club_admin"
     if action == "approve":
-        db_write(
-            "UPDATE team_membership SET is_approved=1, approved_at=NOW() "
-            "WHERE user_id=%s AND team_id=%s",
-            (user_id, team_id)
-        )
+        changed = db_write("""
+            UPDATE team_membership tm JOIN teams t ON t.id=tm.team_id
+            SET tm.is_approved=1, tm.approved_at=NOW()
+            WHERE tm.user_id=%s AND tm.team_id=%s AND tm.is_approved=0
+              AND (t.captain_id=%s OR %s)
+        """, (user_id, team_id, current_user.id, is_admin), rowcount=True)
+        if not changed:
+            flash("Anfrage nicht gefunden.", "warning")
+            return redirect(url_for("team_manage", team_id=team_id))
         u = db_read("SELECT email, first_name FROM users WHERE id=%s", (user_id,), single=True)
         if u:
             send_email(
@@ -424,7 +413,13 @@ def team_requests():
             )
         flash("Anfrage approved.", "success")
     else:
-        db_write("DELETE FROM team_membership WHERE user_id=%s AND team_id=%s", (user_id, team_id))
+        changed = db_write("""
+            DELETE tm FROM team_membership tm JOIN teams t ON t.id=tm.team_id
+            WHERE tm.user_id=%s AND tm.team_id=%s AND (t.captain_id=%s OR %s)
+        """, (user_id, team_id, current_user.id, is_admin), rowcount=True)
+        if not changed:
+            flash("Anfrage nicht gefunden.", "warning")
+            return redirect(url_for("team_manage", team_id=team_id))
         flash("Anfrage denied.", "warning")
 
     return redirect(url_for("team_manage", team_id=team_id))
@@ -434,29 +429,35 @@ def team_requests():
 # Match creation (captain)
 # ------------------------
 
+def _proposal_dates(form) -> list:
+    """Non-empty proposal_dates from an HTML datetime-local form, as MySQL DATETIME strings."""
+    return [d.replace("T", " ", 1) for d in form.getlist("proposal_dates") if d]
+
+
 @app.post("/match/create")
 @login_required
 def match_create():
-    team_id = int(request.form["team_id"])
+    f = request.form
+    team_id = int(f["team_id"])
     team = require_captain(team_id)
     if not team:
         return "Unauthorized", 403
 
-    opponent = request.form["opponent"].strip()
-    location = request.form["location"].strip()
+    opponent = f["opponent"].strip()
+    location = f["location"].strip()
 
-    db_write(
-        "INSERT INTO matches (team_id, opponent, location) VALUES (%s, %s, %s)",
-        (team_id, opponent, location)
-    )
-    match_id = safe_get_match_id(team_id, opponent, location)
+    dates = _proposal_dates(f)
+    with db_transaction() as cur:
+        cur.execute(
+            "INSERT INTO matches (team_id, opponent, location) VALUES (%s, %s, %s)",
+            (team_id, opponent, location)
+        )
+        match_id = cur.lastrowid
 
-    dates = request.form.getlist("proposal_dates")
-    for d in dates:
-        if d:
-            db_write(
+        if dates:
+            cur.executemany(
                 "INSERT INTO match_dates (match_id, proposed_datetime) VALUES (%s, %s)",
-                (match_id, d.replace("T", " "))
+                [(match_id, d) for d in dates]
             )
 
     members = db_read("""
@@ -464,12 +465,14 @@ def match_create():
         FROM team_membership tm JOIN users u ON u.id=tm.user_id
         WHERE tm.team_id=%s AND tm.is_approved=1
     """, (team_id,))
-    for m in members:
-        send_email(
+    send_emails([
+        (
             m["email"],
             "Neues Match geplant",
             f"Hallo {m['first_name']},\n\nEin neues Match wurde geplant. Bitte trage deine Verfügbarkeit ein.\n\n— Interclub Organizer"
         )
+        for m in members
+    ])
 
     flash("Match erstellt. Verfügbarkeiten können eingetragen werden.", "success")
     return redirect(url_for("match_detail", match_id=match_id))
@@ -481,27 +484,22 @@ def match_create():
 
 def require_match_member(match_id: int):
     row = db_read("""
-        SELECT m.*, t.name AS team_name, t.captain_id
+        SELECT m.id, m.team_id, m.opponent, m.location, m.status, m.final_date,
+               t.name AS team_name, t.captain_id, (tm.user_id IS NOT NULL) AS is_member
         FROM matches m JOIN teams t ON t.id=m.team_id
+        LEFT JOIN team_membership tm
+               ON tm.team_id=m.team_id AND tm.user_id=%s AND tm.is_approved=1
         WHERE m.id=%s
-    """, (match_id,), single=True)
-    if not row:
-        return None, None
-
-    mem = db_read("""
-        SELECT * FROM team_membership
-        WHERE team_id=%s AND user_id=%s AND is_approved=1
-    """, (row["team_id"], current_user.id), single=True)
+    """, (current_user.id, match_id), single=True)
 
-    if not mem and current_user.role != "club_admin":
+    if not row or (not row["is_member"] and current_user.role != "club_admin"):
         return None, None
-
     return row, row["team_name"]
 
 
 def require_match_captain(match_id: int):
     row = db_read("""
-        SELECT m.*, t.captain_id
+        SELECT m.id, m.team_id, m.opponent, m.location, t.captain_id
         FROM matches m JOIN teams t ON t.id=m.team_id
         WHERE m.id=%s
     """, (match_id,), single=True)
@@ -516,6 +514,9 @@ def require_match_captain(match_id: int):
 # Match detail (players can volunteer + message)
 # ------------------------
 
+MATCH_TASKS = ("Balls", "Drinks", "Transport")
+
+
 @app.get("/match/<int:match_id>")
 @login_required
 def match_detail(match_id):
@@ -525,7 +526,10 @@ def match_detail(match_id):
 
     is_captain = (match["captain_id"] == current_user.id) or (current_user.role == "club_admin")
 
-    date_options = db_read("SELECT * FROM match_dates WHERE match_id=%s ORDER BY proposed_datetime", (match_id,))
+    date_options = db_read(
+        "SELECT id, proposed_datetime FROM match_dates WHERE match_id=%s ORDER BY proposed_datetime",
+        (match_id,)
+    )
     my_av = db_read("""
         SELECT md.id
         FROM availability a
@@ -536,41 +540,53 @@ def match_detail(match_id):
 
     date_summaries = []
     if is_captain and match["status"] == "planned":
-        for d in date_options:
-            rows = db_read("""
-                SELECT u.first_name,u.last_name
-                FROM availability a JOIN users u ON u.id=a.user_id
-                WHERE a.match_date_id=%s AND a.available=1
-                ORDER BY u.last_name
-            """, (d["id"],))
-            names = ", ".join([f"{r['first_name']} {r['last_name']}" for r in rows]) if rows else "—"
-            date_summaries.append({
-                "id": d["id"],
-                "proposed_datetime": d["proposed_datetime"],
-                "count": len(rows),
-                "names": names
-            })
-
-    members = db_read("""
-        SELECT u.id,u.first_name,u.last_name
-        FROM team_membership tm JOIN users u ON u.id=tm.user_id
-        WHERE tm.team_id=%s AND tm.is_approved=1
-        ORDER BY u.last_name
-    """, (match["team_id"],))
-
-    lineup_rows = db_read("SELECT user_id, confirmed FROM lineup WHERE match_id=%s", (match_id,))
-    lineup_ids = {r["user_id"] for r in lineup_rows}
-    in_lineup = current_user.id in lineup_ids
-    confirmed = any(r["user_id"] == current_user.id and r["confirmed"] == 1 for r in lineup_rows)
+        date_summaries = db_read("""
+            SELECT md.id, md.proposed_datetime,
+                   COUNT(a.user_id) AS count,
+                   COALESCE(GROUP_CONCAT(CONCAT(u.first_name,' ',u.last_name)
+                                         ORDER BY u.last_name SEPARATOR ', '), '—') AS names
+            FROM match_dates md
+            LEFT JOIN availability a ON a.match_date_id=md.id AND a.available=1
+            LEFT JOIN users u ON u.id=a.user_id
+            WHERE md.match_id=%s
+            GROUP BY md.id, md.proposed_datetime
+            ORDER BY md.proposed_datetime
+        """, (match_id,))
 
+    # Roster and lineup overview are only rendered for the captain
+    members = []
+    lineup_ids = set()
     lineup_status = []
-    if is_captain and lineup_rows:
-        for r in lineup_rows:
-            u = db_read("SELECT first_name,last_name FROM users WHERE id=%s", (r["user_id"],), single=True)
-            if u:
-                lineup_status.append({"name": f"{u['first_name']} {u['last_name']}", "confirmed": bool(r["confirmed"])})
+    if is_captain:
+        members = db_read("""
+            SELECT u.id,u.first_name,u.last_name
+            FROM team_membership tm JOIN users u ON u.id=tm.user_id
+            WHERE tm.team_id=%s AND tm.is_approved=1
+            ORDER BY u.last_name
+        """, (match["team_id"],))
+
+        lineup_rows = db_read("""
+            SELECT l.user_id, l.confirmed, u.first_name, u.last_name
+            FROM lineup l JOIN users u ON u.id=l.user_id
+            WHERE l.match_id=%s
+        """, (match_id,))
+        lineup_ids = {r["user_id"] for r in lineup_rows}
+        in_lineup = current_user.id in lineup_ids
+        confirmed = any(r["user_id"] == current_user.id and r["confirmed"] == 1 for r in lineup_rows)
+        lineup_status = [
+            {"name": f"{r['first_name']} {r['last_name']}", "confirmed": bool(r["confirmed"])}
+            for r in lineup_rows
+        ]
+    else:
+        my_lineup = db_read(
+            "SELECT confirmed FROM lineup WHERE match_id=%s AND user_id=%s",
+            (match_id, current_user.id),
+            single=True
+        )
+        in_lineup = my_lineup is not None
+        confirmed = bool(my_lineup and my_lineup["confirmed"] == 1)
 
-    tasks = ["Balls", "Drinks", "Transport"]
+    tasks = MATCH_TASKS
     task_rows = db_read("""
         SELECT task, CONCAT(u.first_name,' ',u.last_name) AS name
         FROM match_tasks mt JOIN users u ON u.id=mt.user_id
@@ -620,81 +636,48 @@ def match_edit(match_id):
     if not row:
         return "Unauthorized", 403
 
-    # inline editor page (no template needed)
-    return f"""
-    <!doctype html><html><head><meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <title>Match bearbeiten</title>
-    </head><body class="p-4">
-    <div class="container" style="max-width:860px;">
-      <h3 class="mb-3">Match bearbeiten</h3>
-      <form method="post" action="/match/{match_id}/edit" class="card p-3">
-        <div class="mb-3">
-          <label class="form-label">Opponent</label>
-          <input class="form-control" name="opponent" value="{row.get('opponent','')}" required>
-        </div>
-        <div class="mb-3">
-          <label class="form-label">Location</label>
-          <input class="form-control" name="location" value="{row.get('location','')}" required>
-        </div>
-        <div class="mb-3">
-          <label class="form-label">Neue Vorschlagsdaten (optional, überschreibt alles)</label>
-          <div class="text-muted mb-2">Format: HTML datetime-local. Lass leer, wenn du nur Opponent/Location ändern willst.</div>
-          <input class="form-control mb-2" type="datetime-local" name="proposal_dates">
-          <input class="form-control mb-2" type="datetime-local" name="proposal_dates">
-          <input class="form-control mb-2" type="datetime-local" name="proposal_dates">
-        </div>
-        <button class="btn btn-primary">Speichern</button>
-        <a class="btn btn-link" href="/match/{match_id}">Abbrechen</a>
-      </form>
-
-      <form method="post" action="/match/{match_id}/delete" class="mt-3"
-            onsubmit="return confirm('Match wirklich löschen?');">
-        <button class="btn btn-danger">Match löschen</button>
-      </form>
-    </div></body></html>
-    """
+    return render_template(
+        "match_edit.html",
+        match_id=match_id,
+        opponent=row.get("opponent", ""),
+        location=row.get("location", "")
+    )
 
 
 @app.post("/match/<int:match_id>/edit")
 @login_required
 def match_edit_post(match_id):
+    f = request.form
     row = require_match_captain(match_id)
     if not row:
         return "Unauthorized", 403
 
-    opponent = request.form["opponent"].strip()
-    location = request.form["location"].strip()
-
-    db_write(
-        "UPDATE matches SET opponent=%s, location=%s WHERE id=%s",
-        (opponent, location, match_id)
-    )
+    opponent = f["opponent"].strip()
+    location = f["location"].strip()
 
     # If proposal_dates provided, reset schedule (and availability based on old dates)
-    proposed = [d for d in request.form.getlist("proposal_dates") if d]
-    if proposed:
-        # delete availability for this match
-        db_write("""
-            DELETE a FROM availability a
-            JOIN match_dates md ON md.id=a.match_date_id
-            WHERE md.match_id=%s
-        """, (match_id,))
-        db_write("DELETE FROM match_dates WHERE match_id=%s", (match_id,))
+    proposed = _proposal_dates(f)
 
-        for d in proposed:
-            db_write(
+    with db_transaction() as cur:
+        if not proposed:
+            cur.execute(
+                "UPDATE matches SET opponent=%s, location=%s WHERE id=%s",
+                (opponent, location, match_id)
+            )
+        else:
+            # revert to planned if dates changed
+            cur.execute(
+                "UPDATE matches SET opponent=%s, location=%s, status='planned', final_date=NULL "
+                "WHERE id=%s",
+                (opponent, location, match_id)
+            )
+            # availability for the old dates is removed by ON DELETE CASCADE
+            cur.execute("DELETE FROM match_dates WHERE match_id=%s", (match_id,))
+            cur.executemany(
                 "INSERT INTO match_dates (match_id, proposed_datetime) VALUES (%s, %s)",
-                (match_id, d.replace("T", " "))
+                [(match_id, d) for d in proposed]
             )
 
-        # revert to planned if dates changed
-        db_write(
-            "UPDATE matches SET status='planned', final_date=NULL WHERE id=%s",
-            (match_id,)
-        )
-
     flash("Match gespeichert.", "success")
     return redirect(url_for("match_detail", match_id=match_id))
 
@@ -706,16 +689,7 @@ def match_delete(match_id):
     if not row:
         return "Unauthorized", 403
 
-    # Delete match-related
-    db_write("DELETE FROM match_messages WHERE match_id=%s", (match_id,))
-    db_write("DELETE FROM match_tasks WHERE match_id=%s", (match_id,))
-    db_write("DELETE FROM lineup WHERE match_id=%s", (match_id,))
-    db_write("""
-        DELETE a FROM availability a
-        JOIN match_dates md ON md.id=a.match_date_id
-        WHERE md.match_id=%s
-    """, (match_id,))
-    db_write("DELETE FROM match_dates WHERE match_id=%s", (match_id,))
+    # Dates, availability, lineup, tasks and messages go with it (ON DELETE CASCADE)
     db_write("DELETE FROM matches WHERE id=%s", (match_id,))
 
     flash("Match gelöscht.", "success")
@@ -729,24 +703,42 @@ def match_delete(match_id):
 @app.post("/match/availability")
 @login_required
 def match_availability():
-    match_id = int(request.form["match_id"])
+    f = request.form
+    match_id = int(f["match_id"])
     match, _ = require_match_member(match_id)
     if not match:
         return "Unauthorized", 403
 
-    selected = {int(x) for x in request.form.getlist("date_ids")}
+    selected = {int(x) for x in f.getlist("date_ids")}
 
-    db_write("""
-        DELETE a FROM availability a
-        JOIN match_dates md ON md.id=a.match_date_id
-        WHERE md.match_id=%s AND a.user_id=%s
-    """, (match_id, current_user.id))
-
-    for date_id in selected:
-        db_write(
-            "INSERT INTO availability (match_date_id, user_id, available) VALUES (%s, %s, 1)",
-            (date_id, current_user.id)
-        )
+    # Only touch rows that change: upsert newly selected dates, delete deselected ones
+    rows = db_read("""
+        SELECT md.id, a.available
+        FROM match_dates md
+        LEFT JOIN availability a ON a.match_date_id=md.id AND a.user_id=%s
+        WHERE md.match_id=%s
+    """, (current_user.id, match_id))
+    selected &= {r["id"] for r in rows}
+    current = {r["id"] for r in rows if r["available"] == 1}
+    existing = {r["id"] for r in rows if r["available"] is not None}
+
+    to_add = selected - current
+    to_remove = existing - selected
+    if to_add or to_remove:
+        # Commit the upserts and deletes together
+        with db_transaction() as cur:
+            if to_add:
+                cur.executemany(
+                    "INSERT INTO availability (match_date_id, user_id, available) VALUES (%s, %s, 1) "
+                    "ON DUPLICATE KEY UPDATE available=1",
+                    [(date_id, current_user.id) for date_id in to_add]
+                )
+            if to_remove:
+                cur.execute(
+                    "DELETE FROM availability WHERE user_id=%s AND match_date_id IN ("
+                    + ",".join(["%s"] * len(to_remove)) + ")",
+                    (current_user.id, *to_remove)
+                )
 
     flash("Verfügbarkeit gespeichert.", "success")
     return redirect(url_for("match_detail", match_id=match_id))
@@ -759,8 +751,9 @@ def match_availability():
 @app.post("/match/confirm_date")
 @login_required
 def match_confirm_date():
-    match_id = int(request.form["match_id"])
-    date_id = int(request.form["date_id"])
+    f = request.form
+    match_id = int(f["match_id"])
+    date_id = int(f["date_id"])
 
     match = db_read("""
         SELECT m.id, m.team_id, t.captain_id
@@ -796,7 +789,8 @@ def match_confirm_date():
 @app.post("/match/set_lineup")
 @login_required
 def match_set_lineup():
-    match_id = int(request.form["match_id"])
+    f = request.form
+    match_id = int(f["match_id"])
 
     match = db_read("""
         SELECT m.team_id, t.captain_id
@@ -808,14 +802,34 @@ def match_set_lineup():
     if match["captain_id"] != current_user.id and current_user.role != "club_admin":
         return "Unauthorized", 403
 
-    selected = {int(x) for x in request.form.getlist("player_ids")}
-
-    db_write("DELETE FROM lineup WHERE match_id=%s", (match_id,))
-    for uid in selected:
-        db_write(
-            "INSERT INTO lineup (match_id, user_id, confirmed) VALUES (%s, %s, 0)",
-            (match_id, uid)
+    selected = {int(x) for x in f.getlist("player_ids")}
+    if selected:
+        # Only approved members of this team can be put in the lineup
+        valid = db_read(
+            "SELECT user_id FROM team_membership WHERE team_id=%s AND is_approved=1 AND user_id IN ("
+            + ",".join(["%s"] * len(selected)) + ")",
+            (match["team_id"], *selected)
         )
+        selected &= {r["user_id"] for r in valid}
+
+    # Only touch players that change, so players who stay keep their confirmation
+    with db_transaction() as cur:
+        cur.execute("SELECT user_id FROM lineup WHERE match_id=%s", (match_id,))
+        current = {r["user_id"] for r in cur.fetchall()}
+
+        to_remove = current - selected
+        if to_remove:
+            cur.execute(
+                "DELETE FROM lineup WHERE match_id=%s AND user_id IN ("
+                + ",".join(["%s"] * len(to_remove)) + ")",
+                (match_id, *to_remove)
+            )
+        to_add = selected - current
+        if to_add:
+            cur.executemany(
+                "INSERT INTO lineup (match_id, user_id, confirmed) VALUES (%s, %s, 0)",
+                [(match_id, uid) for uid in to_add]
+            )
 
     flash("Lineup gespeichert. Spieler bestätigen selbst.", "success")
     return redirect(url_for("match_detail", match_id=match_id))
@@ -828,11 +842,12 @@ def match_set_lineup():
 @app.post("/match/confirm_lineup")
 @login_required
 def match_confirm_lineup():
-    match_id = int(request.form["match_id"])
-    response = request.form["response"]
+    f = request.form
+    match_id = int(f["match_id"])
+    response = f["response"]
 
     row = db_read(
-        "SELECT * FROM lineup WHERE match_id=%s AND user_id=%s",
+        "SELECT 1 FROM lineup WHERE match_id=%s AND user_id=%s",
         (match_id, current_user.id),
         single=True
     )
@@ -862,26 +877,27 @@ def match_confirm_lineup():
 @app.post("/match/task")
 @login_required
 def match_task():
-    match_id = int(request.form["match_id"])
-    task = request.form["task"]
+    f = request.form
+    match_id = int(f["match_id"])
+    task = f["task"]
 
     match, _ = require_match_member(match_id)
     if not match:
         return "Unauthorized", 403
 
-    exists = db_read(
-        "SELECT * FROM match_tasks WHERE match_id=%s AND task=%s",
-        (match_id, task),
-        single=True
-    )
-    if exists:
-        flash("Task ist bereits vergeben.", "warning")
+    if task not in MATCH_TASKS:
+        flash("Unbekannter Task.", "danger")
         return redirect(url_for("match_detail", match_id=match_id))
 
-    db_write(
-        "INSERT INTO match_tasks (match_id, task, user_id) VALUES (%s, %s, %s)",
-        (match_id, task, current_user.id)
+    # PRIMARY KEY (match_id, task): first volunteer wins, later inserts are ignored
+    taken = db_write(
+        "INSERT IGNORE INTO match_tasks (match_id, task, user_id) VALUES (%s, %s, %s)",
+        (match_id, task, current_user.id),
+        rowcount=True
     )
+    if not taken:
+        flash("Task ist bereits vergeben.", "warning")
+        return redirect(url_for("match_detail", match_id=match_id))
 
     flash(f"Du übernimmst: {task}", "success")
     return redirect(url_for("match_detail", match_id=match_id))
@@ -894,8 +910,9 @@ def match_task():
 @app.post("/match/message")
 @login_required
 def match_message():
-    match_id = int(request.form["match_id"])
-    content = request.form["content"].strip()
+    f = request.form
+    match_id = int(f["match_id"])
+    content = f["content"].strip()
 
     match, _ = require_match_member(match_id)
     if not match: